@@ -1,9 +1,12 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request, stream_with_context
 from flask_cors import CORS
 import json
 import os
+import time
 from datetime import datetime
 from services.ChildPubService import ChildPubService
+from services.StatsService import StatsService
+from services.ChangeFeedService import ChangeFeedService
 from dotenv import load_dotenv
 import logging
 
@@ -34,6 +37,36 @@ def load_json_data(filename):
     with open(filename, 'r', encoding='utf-8') as f:
         return json.load(f)
 
+def get_network_code_arg(usage):
+    """Read and validate the network_code query parameter, returning (code, error response)."""
+    network_code = request.args.get('network_code') or request.args.get('networkCode')
+    
+    if not network_code:
+        return None, (jsonify({
+            'success': False,
+            'error': 'Missing required parameter: network_code',
+            'usage': usage
+        }), 400)
+    
+    if not network_code.isdigit() or len(network_code) != 11:
+        return None, (jsonify({
+            'success': False,
+            'error': 'Invalid network_code. Must be 11 digits.',
+            'provided': network_code
+        }), 400)
+    
+    return network_code, None
+
+def parse_timestamp_arg(name):
+    """Parse an ISO timestamp query parameter as naive local time, like the stored fetched_at values."""
+    value = request.args.get(name)
+    if not value:
+        return None
+    timestamp = datetime.fromisoformat(value)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone().replace(tzinfo=None)
+    return timestamp
+
 def is_data_fresh(fetched_at, max_hours=24):
     """Check if data is less than max_hours old."""
     try:
@@ -55,11 +88,16 @@ def home():
             '/': 'API documentation',
             '/fetch?network_code=<code>': 'Fetch child publishers for network (cached)',
             '/fetch?network_code=<code>&refresh=true': 'Force fresh fetch from GAM',
+            '/stats?network_code=<code>': 'Latest status counts (from, to, limit for a time series)',
+            '/changes?network_code=<code>&since=<sequence>': 'Publishers changed after a sequence (optional wait=<seconds> to long-poll)',
+            '/changes/stream?network_code=<code>&since=<sequence>': 'Server-sent events stream of changes (reconnect with Last-Event-ID)',
             '/health': 'Health check'
         },
         'usage': {
             'example_1': '/fetch?network_code=23033612553',
-            'example_2': '/fetch?network_code=23033612553&refresh=true'
+            'example_2': '/fetch?network_code=23033612553&refresh=true',
+            'example_3': '/stats?network_code=23033612553&from=2024-01-01T00:00:00&limit=30',
+            'example_4': '/changes?network_code=23033612553&since=42&wait=30'
         }
     })
 
@@ -83,23 +121,10 @@ def fetch_network_data():
     Returns:
         JSON with child publishers data
     """
-    # Get network code from query parameters
-    network_code = request.args.get('network_code') or request.args.get('networkCode')
-    
-    if not network_code:
-        return jsonify({
-            'success': False,
-            'error': 'Missing required parameter: network_code',
-            'usage': '/fetch?network_code=23033612553'
-        }), 400
-    
-    # Validate network code (should be 11 digits)
-    if not network_code.isdigit() or len(network_code) != 11:
-        return jsonify({
-            'success': False,
-            'error': 'Invalid network_code. Must be 11 digits.',
-            'provided': network_code
-        }), 400
+    # Get and validate network code from query parameters
+    network_code, error = get_network_code_arg('/fetch?network_code=23033612553')
+    if error:
+        return error
     
     # Check if refresh is requested
     force_refresh = request.args.get('refresh', '').lower() == 'true'
@@ -121,6 +146,7 @@ def fetch_network_data():
                         'network_code': cached_data['network_code'],
                         'total_count': cached_data['total_count'],
                         'fetched_at': cached_data['fetched_at'],
+                        'sequence': cached_data.get('sequence'),
                         'children': cached_data['child_publishers'],
                         'message': f'Data from cache ({hours_old:.1f} hours old). Add &refresh=true to force fresh fetch.'
                     })
@@ -138,6 +164,7 @@ def fetch_network_data():
                 'network_code': result['network_code'],
                 'total_count': result['total_count'],
                 'fetched_at': result['fetched_at'],
+                'sequence': result.get('sequence'),
                 'children': result['child_publishers'],
                 'message': 'Data fetched successfully from GAM'
             })
@@ -155,12 +182,188 @@ def fetch_network_data():
             'error': str(e)
         }), 500
 
+@app.route('/stats', methods=['GET'])
+def network_stats():
+    """
+    Get precomputed status counts for a GAM network.
+    
+    Query Parameters:
+        network_code (required): 11-digit GAM network code
+        from (optional): ISO timestamp, only include snapshots fetched at or after it
+        to (optional): ISO timestamp, only include snapshots fetched at or before it
+        limit (optional): Return the most recent N snapshots in range (max 1000).
+            Defaults to 1 (just the latest counts) without from/to, and to 1000 with them
+    
+    Returns:
+        JSON with the requested points of the time series, oldest first
+    """
+    network_code, error = get_network_code_arg('/stats?network_code=23033612553')
+    if error:
+        return error
+    
+    try:
+        start = parse_timestamp_arg('from')
+        end = parse_timestamp_arg('to')
+        default_limit = StatsService.MAX_LIMIT if start or end else StatsService.DEFAULT_LIMIT
+        limit = int(request.args.get('limit', default_limit))
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'error': 'Invalid range. Use ISO timestamps for from/to and an integer for limit.'
+        }), 400
+    
+    if limit < 1 or limit > StatsService.MAX_LIMIT:
+        return jsonify({
+            'success': False,
+            'error': f'Invalid limit. Must be between 1 and {StatsService.MAX_LIMIT}.',
+            'provided': limit
+        }), 400
+    
+    series = StatsService.get_series(network_code, start=start, end=end, limit=limit)
+    return jsonify({
+        'success': True,
+        'network_code': network_code,
+        'count': len(series),
+        'series': series
+    })
+
+@app.route('/changes', methods=['GET'])
+def network_changes():
+    """
+    Get child publishers that changed after a snapshot sequence number.
+    
+    Query Parameters:
+        network_code (required): 11-digit GAM network code
+        since (optional): Sequence number already in sync with (default 0 = everything)
+        wait (optional): Seconds to long-poll for changes if there are none yet (max 60)
+    
+    Returns:
+        JSON with the next sequence cursor and the changed publishers, or 410 with
+        reset=true when the cursor is no longer valid and the consumer must resync from /fetch?refresh=true
+    """
+    network_code, error = get_network_code_arg('/changes?network_code=23033612553&since=0')
+    if error:
+        return error
+    
+    try:
+        since = int(request.args.get('since', 0))
+        wait = min(float(request.args.get('wait', 0)), 60)
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'error': 'Invalid since or wait. since must be an integer and wait a number of seconds.'
+        }), 400
+    
+    if since < 0:
+        return jsonify({
+            'success': False,
+            'error': 'Invalid since. Must not be negative.',
+            'provided': since
+        }), 400
+    
+    if wait > 0:
+        feed = ChangeFeedService.wait_for_changes(network_code, since=since, timeout=wait)
+    else:
+        feed = ChangeFeedService.get_changes(network_code, since=since)
+    
+    if feed['reset']:
+        return jsonify({
+            'success': False,
+            'reset': True,
+            'network_code': network_code,
+            'since': since,
+            'sequence': feed['sequence'],
+            'error': 'Cursor is no longer valid. Resync from /fetch?refresh=true and continue from its sequence.'
+        }), 410
+    
+    return jsonify({
+        'success': True,
+        'network_code': network_code,
+        'since': since,
+        'sequence': feed['sequence'],
+        'count': len(feed['changes']),
+        'changes': feed['changes']
+    })
+
+@app.route('/changes/stream', methods=['GET'])
+def network_changes_stream():
+    """
+    Stream child publisher changes as server-sent events.
+    
+    Each event carries the changes since the previous one with its sequence as
+    the event id. The connection is closed after ChangeFeedService.STREAM_MAX_SECONDS
+    so a subscriber never holds a worker indefinitely; EventSource clients
+    reconnect on their own and resume from the Last-Event-ID header. A `reset`
+    event means the cursor is no longer valid and the client must resync from
+    /fetch?refresh=true. An invalid cursor on connect is answered with 410 instead of
+    a stream, so EventSource stops reconnecting.
+    
+    Query Parameters:
+        network_code (required): 11-digit GAM network code
+        since (optional): Sequence number already in sync with (default 0 = everything)
+    """
+    network_code, error = get_network_code_arg('/changes/stream?network_code=23033612553&since=0')
+    if error:
+        return error
+    
+    try:
+        since = int(request.headers.get('Last-Event-ID') or request.args.get('since', 0))
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'error': 'Invalid since. Must be an integer.'
+        }), 400
+    
+    if since < 0:
+        return jsonify({
+            'success': False,
+            'error': 'Invalid since. Must not be negative.',
+            'provided': since
+        }), 400
+    
+    # Reject a bad cursor up front: EventSource reconnects after a stream ends,
+    # but not after a non-200 response
+    feed = ChangeFeedService.get_changes(network_code, since=since)
+    if feed['reset']:
+        return jsonify({
+            'success': False,
+            'reset': True,
+            'network_code': network_code,
+            'since': since,
+            'sequence': feed['sequence'],
+            'error': 'Cursor is no longer valid. Resync from /fetch?refresh=true and continue from its sequence.'
+        }), 410
+    
+    def events(cursor):
+        deadline = time.monotonic() + ChangeFeedService.STREAM_MAX_SECONDS
+        yield "retry: 1000\n\n"
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            # Heartbeat comment after each idle wait keeps proxies from closing the connection
+            feed = ChangeFeedService.wait_for_changes(network_code, since=cursor, timeout=min(15, remaining))
+            if feed['reset']:
+                yield f"event: reset\ndata: {json.dumps(feed, ensure_ascii=False)}\n\n"
+                return
+            if feed['changes']:
+                cursor = feed['sequence']
+                yield f"id: {cursor}\nevent: changes\ndata: {json.dumps(feed, ensure_ascii=False)}\n\n"
+            else:
+                yield ": keep-alive\n\n"
+    
+    return Response(
+        stream_with_context(events(since)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.errorhandler(404)
 def not_found(error):
     return jsonify({
         'success': False,
         'error': 'Endpoint not found',
-        'available_endpoints': ['/', '/fetch', '/health']
+        'available_endpoints': ['/', '/fetch', '/stats', '/changes', '/changes/stream', '/health']
     }), 404
 
 @app.errorhandler(500)
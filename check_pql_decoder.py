@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+"""
+Check the fast PQL decoder against zeep on recorded selectResponse envelopes.
+
+Every fixture is deserialised both by utils.pql.decode_select_response and by
+zeep (through the same binding googleads uses), and the outcomes must match:
+identical rows, a fallback for values the fast decoder does not handle, or a
+fault on both sides.
+
+Each fixture is then replayed through a real googleads ZeepServiceProxy, and
+select_rows(fast=True) must return or raise exactly what select_rows(fast=False)
+does while sending a single request. This exercises the googleads internals the
+fast path relies on, including the fault and non-200 paths. Run this before
+enabling GAM_FAST_PQL, and again after upgrading googleads.
+
+Usage:
+    python check_pql_decoder.py [--wsdl PATH_OR_URL] [fixture.xml ...]
+
+Without fixture arguments all envelopes in fixtures/pql/ are checked. Pass the
+live WSDL URL to check against the full schema instead of the trimmed copy.
+"""
+import argparse
+import glob
+import os
+import sys
+import requests
+import zeep
+from zeep.helpers import serialize_object
+from googleads import common
+from googleads.errors import GoogleAdsServerFault
+from utils.pql import decode_select_response, select_rows, FaultResponse, UnsupportedResponse
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'pql')
+
+# A non-SOAP error page, as returned by a proxy in front of GAM
+GATEWAY_ERROR = (502, b'<html><body>Bad Gateway</body></html>', 'text/html')
+
+
+class RecordedResponse:
+    """Minimal stand-in for the requests.Response zeep expects."""
+
+    def __init__(self, content):
+        self.status_code = 200
+        self.headers = {'Content-Type': 'text/xml; charset=UTF-8'}
+        self.encoding = 'utf-8'
+        self.content = content
+        self.text = content.decode('utf-8')
+
+
+def decode_with_zeep(client, content):
+    """Return ('rows', labels, rows) or ('fault',) using zeep's deserialisation."""
+    binding = client.service._binding
+    try:
+        result = binding.process_reply(client, binding.get('select'), RecordedResponse(content))
+    except zeep.exceptions.Fault:
+        return ('fault',)
+    rval = result['body']['rval']
+    labels = [column['labelName'] for column in rval['columnTypes']]
+    rows = [tuple(value['value'] for value in row['values']) for row in (rval['rows'] or [])]
+    return ('rows', labels, rows)
+
+
+def decode_with_fast_path(content):
+    """Return ('rows', labels, rows), ('fault',) or ('fallback',) using the fast decoder."""
+    try:
+        result = decode_select_response(content)
+    except FaultResponse:
+        return ('fault',)
+    except UnsupportedResponse:
+        return ('fallback',)
+    return ('rows', [column['labelName'] for column in result['columnTypes']], result['rows'])
+
+
+class CheckHeaderHandler(common.HeaderHandler):
+    """Header handler building the same SOAP request header as the Ad Manager one."""
+
+    def GetSOAPHeaders(self, create_method):
+        header = create_method('ns0:SoapRequestHeader')
+        header.networkCode = '12345678901'
+        header.applicationName = 'check_pql_decoder'
+        return header
+
+    def GetHTTPHeaders(self):
+        return {}
+
+
+def replaying_service(wsdl, status_code, content, content_type='text/xml; charset=UTF-8'):
+    """Build a googleads PQL service proxy whose transport replays one recorded response."""
+    service = common.ZeepServiceProxy(
+        wsdl, CheckHeaderHandler(), None, common.ProxyConfig(), 60, 'v202411',
+        cache=common.ZeepServiceProxy.NO_CACHE)
+    service.requests_sent = 0
+
+    def post(address, message, headers):
+        service.requests_sent += 1
+        response = requests.Response()
+        response.status_code = status_code
+        response._content = content
+        response.headers['Content-Type'] = content_type
+        response.encoding = 'utf-8'
+        return response
+
+    service.zeep_client.transport.post = post
+    return service
+
+
+def run_select_rows(wsdl, fast, status_code, content, content_type):
+    """Return (outcome, requests sent) for select_rows against a replayed response."""
+    service = replaying_service(wsdl, status_code, content, content_type)
+    try:
+        result = select_rows(service, 'SELECT Id FROM child_publisher', fast=fast)
+        # zeep objects (e.g. a DateValue's Date) only compare equal once serialised
+        rows = [tuple(serialize_object(value) for value in row) for row in result['rows']]
+        outcome = ('rows', result['columnTypes'], rows)
+    except GoogleAdsServerFault as e:
+        outcome = ('fault', str(e), [dict(error.__values__) for error in (e.errors or ())])
+    return outcome, service.requests_sent
+
+
+def check_select_rows(wsdl, name, status_code, content, content_type='text/xml; charset=UTF-8'):
+    """Compare select_rows(fast=True) with select_rows(fast=False) on one response."""
+    expected, _ = run_select_rows(wsdl, False, status_code, content, content_type)
+    actual, sent = run_select_rows(wsdl, True, status_code, content, content_type)
+
+    ok = actual == expected and sent == 1
+    status = 'ok' if ok else 'MISMATCH'
+    print(f"{status:8} select_rows {name} (HTTP {status_code}): {actual[0]}, {sent} request(s)")
+    if not ok:
+        print(f"         fast=False: {expected}")
+        print(f"         fast=True:  {actual}")
+    return ok
+
+
+def check_gateway_error(wsdl):
+    """
+    A non-SOAP error page must raise GoogleAdsServerFault after a single request.
+
+    There is nothing to compare with here: googleads' own wrapper fails with a
+    TypeError on such pages, because zeep puts the raw bytes in the fault detail.
+    """
+    outcome, sent = run_select_rows(wsdl, True, *GATEWAY_ERROR)
+    ok = outcome[0] == 'fault' and sent == 1
+    status = 'ok' if ok else 'MISMATCH'
+    print(f"{status:8} select_rows gateway error page (HTTP {GATEWAY_ERROR[0]}): {outcome[0]}, {sent} request(s)")
+    if not ok:
+        print(f"         fast=True:  {outcome}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--wsdl', default=os.path.join(FIXTURE_DIR, 'PublisherQueryLanguageService.wsdl'))
+    parser.add_argument('fixtures', nargs='*')
+    args = parser.parse_args()
+
+    fixtures = args.fixtures or sorted(glob.glob(os.path.join(FIXTURE_DIR, '*.xml')))
+    if not fixtures:
+        print("Error: No fixtures found")
+        sys.exit(1)
+
+    client = zeep.Client(args.wsdl)
+    failures = 0
+    for fixture in fixtures:
+        with open(fixture, 'rb') as f:
+            content = f.read()
+        expected = decode_with_zeep(client, content)
+        actual = decode_with_fast_path(content)
+
+        # A fallback re-runs the query through zeep, so it always matches
+        ok = actual == expected or (actual == ('fallback',) and expected[0] == 'rows')
+        status = 'ok' if ok else 'MISMATCH'
+        print(f"{status:8} {os.path.basename(fixture)}: {actual[0]}")
+        if not ok:
+            failures += 1
+            print(f"         zeep: {expected}")
+            print(f"         fast: {actual}")
+
+    checks = len(fixtures)
+    for fixture in fixtures:
+        with open(fixture, 'rb') as f:
+            content = f.read()
+        # GAM answers faults with HTTP 500
+        status_code = 500 if decode_with_fast_path(content) == ('fault',) else 200
+        if not check_select_rows(args.wsdl, os.path.basename(fixture), status_code, content):
+            failures += 1
+        checks += 1
+
+    if not check_gateway_error(args.wsdl):
+        failures += 1
+    checks += 1
+
+    if failures:
+        print(f"Error: {failures} of {checks} checks differ from zeep")
+        sys.exit(1)
+    print(f"Success: {checks} checks match zeep")
+
+
+if __name__ == "__main__":
+    main()
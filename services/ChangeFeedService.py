@@ -0,0 +1,246 @@
+import logging
+import os
+import re
+import json
+import time
+import tempfile
+from utils.helpers import exclusive_lock, read_lines_reversed
+
+# Log entries are written with "sequence" as their first key, so it can be read
+# without decoding the rest of the line
+SEQUENCE_PREFIX = re.compile(r'^\{"sequence": (\d+)')
+
+
+def _write_json_atomic(path, data):
+    """Write JSON through a unique temp file in the same directory, then rename it into place."""
+    fd, temp_file = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(temp_file, path)
+    except Exception:
+        os.unlink(temp_file)
+        raise
+
+
+def _load_json(path, default):
+    if not os.path.exists(path):
+        return default
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _line_sequence(line):
+    match = SEQUENCE_PREFIX.match(line)
+    return int(match.group(1)) if match else None
+
+
+class ChangeFeedService:
+    # Column used to match a publisher across snapshots
+    KEY_FIELD = "ID"
+
+    # Maximum number of seconds a single server-sent events connection is kept open
+    STREAM_MAX_SECONDS = 120
+
+    @staticmethod
+    def get_feed_files(network_code):
+        """Get the change log, last state, metadata and lock file paths for specific network code."""
+        changes_dir = os.getenv('CHANGES_DIR', '.')
+        prefix = os.path.join(changes_dir, f'changes_{network_code}')
+        return {
+            "log": f'{prefix}.jsonl',
+            "state": f'{prefix}_state.json',
+            "meta": f'{prefix}_meta.json',
+            "lock": f'{prefix}.lock',
+        }
+
+    @staticmethod
+    def get_last_logged_sequence(log_file):
+        """Get the sequence of the newest complete entry in the change log, or 0."""
+        if not os.path.exists(log_file):
+            return 0
+        for line in read_lines_reversed(log_file):
+            sequence = _line_sequence(line)
+            if sequence is not None:
+                return sequence
+        return 0
+
+    @staticmethod
+    def record_snapshot(result):
+        """
+        Assign the next sequence number to a ChildPubService snapshot and log
+        the publishers that were added, updated or removed since the last one.
+
+        Writers for the same network are serialised with a lock file. The
+        sequence is derived from both the metadata and the last log entry, so
+        a crash between appending the log and updating the metadata never
+        causes a sequence number to be reused.
+
+        Args:
+            result (dict): Snapshot with network_code, fetched_at, child_publishers.
+
+        Returns:
+            int: The snapshot's sequence number, or None if it could not be stored.
+        """
+        network_code = result.get("network_code")
+        files = ChangeFeedService.get_feed_files(network_code)
+        try:
+            os.makedirs(os.path.dirname(files["log"]) or '.', exist_ok=True)
+            with exclusive_lock(files["lock"]):
+                meta = _load_json(files["meta"], {"sequence": 0, "compacted_through": 0, "entries": 0})
+                state = _load_json(files["state"], {"sequence": 0, "publishers": {}})
+                previous = state["publishers"]
+                current = {
+                    str(publisher.get(ChangeFeedService.KEY_FIELD)): publisher
+                    for publisher in result.get("child_publishers", [])
+                }
+
+                changes = []
+                for key, publisher in current.items():
+                    if key not in previous:
+                        changes.append({"id": key, "change": "added", "publisher": publisher})
+                    elif previous[key] != publisher:
+                        changes.append({"id": key, "change": "updated", "publisher": publisher})
+                for key, publisher in previous.items():
+                    if key not in current:
+                        changes.append({"id": key, "change": "removed", "publisher": publisher})
+
+                sequence = max(
+                    meta["sequence"],
+                    state["sequence"],
+                    ChangeFeedService.get_last_logged_sequence(files["log"]),
+                ) + 1
+                if changes:
+                    entry = {"sequence": sequence, "fetched_at": result.get("fetched_at"), "changes": changes}
+                    with open(files["log"], 'a', encoding='utf-8') as f:
+                        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                    meta["entries"] += 1
+
+                _write_json_atomic(files["state"], {"sequence": sequence, "publishers": current})
+                meta["sequence"] = sequence
+                ChangeFeedService._compact(files, meta)
+                _write_json_atomic(files["meta"], meta)
+
+            logging.info(f"Snapshot {sequence} for network {network_code}: {len(changes)} changed publishers")
+            return sequence
+        except Exception as e:
+            logging.error(f"Failed to record change feed for network {network_code}: {e}")
+            return None
+
+    @staticmethod
+    def _compact(files, meta):
+        """
+        Drop the oldest log entries once the log holds twice CHANGES_RETENTION
+        entries, keeping the newest CHANGES_RETENTION. Must hold the lock.
+        """
+        retention = int(os.getenv('CHANGES_RETENTION', '1000'))
+        if meta["entries"] < 2 * retention or not os.path.exists(files["log"]):
+            return
+
+        with open(files["log"], 'r', encoding='utf-8') as f:
+            lines = [line for line in f if _line_sequence(line) is not None]
+        dropped, kept = lines[:-retention], lines[-retention:]
+        if not dropped:
+            return
+
+        fd, temp_file = tempfile.mkstemp(dir=os.path.dirname(files["log"]) or '.', suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.writelines(kept)
+
+        # Publish the new history boundary before dropping entries. A crash in
+        # between can only cause an unnecessary reset, and get_changes re-reads
+        # the boundary after scanning so concurrent readers notice the drop
+        meta["compacted_through"] = _line_sequence(dropped[-1])
+        meta["entries"] = len(kept)
+        _write_json_atomic(files["meta"], meta)
+        os.replace(temp_file, files["log"])
+        logging.info(f"Compacted {files['log']} through sequence {meta['compacted_through']}")
+
+    @staticmethod
+    def get_changes(network_code, since=0):
+        """
+        Get the publishers that changed after a sequence number.
+
+        The log is read from its end and stops at the first entry at or before
+        `since`, so the work is proportional to the changes returned. Several
+        changes to the same publisher are collapsed into the latest one.
+
+        Args:
+            network_code (str): The network code for the GAM account.
+            since (int): Sequence number the consumer is already in sync with.
+
+        Returns:
+            dict: {"sequence": int, "changes": list, "reset": bool}. sequence is
+                the cursor to pass as `since` next time. reset is True when
+                `since` is ahead of the feed (e.g. its files were lost) or older
+                than the compacted history; the consumer must then resync from
+                /fetch?refresh=true and continue from that snapshot's sequence.
+        """
+        files = ChangeFeedService.get_feed_files(network_code)
+        # Read the metadata before the log: it is only written after the log is appended
+        meta = _load_json(files["meta"], {"sequence": 0, "compacted_through": 0})
+        sequence = meta["sequence"]
+        if since < meta["compacted_through"]:
+            sequence = max(sequence, ChangeFeedService.get_last_logged_sequence(files["log"]))
+            return {"sequence": sequence, "changes": [], "reset": True}
+
+        entries = []
+        if os.path.exists(files["log"]):
+            for line in read_lines_reversed(files["log"]):
+                line_sequence = _line_sequence(line)
+                if line_sequence is None:
+                    continue
+                if line_sequence <= since:
+                    break
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    # Most likely an entry that is still being written; picked up next time
+                    continue
+                sequence = max(sequence, line_sequence)
+
+        # The log may have been compacted while it was being read; the boundary is
+        # published before entries are dropped, so reading it again catches that
+        compacted_through = _load_json(files["meta"], meta)["compacted_through"]
+        if since > sequence or since < compacted_through:
+            return {"sequence": sequence, "changes": [], "reset": True}
+
+        latest = {}
+        for entry in reversed(entries):
+            for change in entry["changes"]:
+                latest.pop(change["id"], None)
+                latest[change["id"]] = dict(change, sequence=entry["sequence"])
+
+        return {"sequence": sequence, "changes": list(latest.values()), "reset": False}
+
+    @staticmethod
+    def wait_for_changes(network_code, since=0, timeout=30, interval=1):
+        """
+        Long-poll for changes after a sequence number.
+
+        Snapshots may be stored by another process (e.g. fetch_gam_api.py), so
+        this watches the change log's size rather than an in-process signal.
+
+        Args:
+            network_code (str): The network code for the GAM account.
+            since (int): Sequence number the consumer is already in sync with.
+            timeout (float): Maximum number of seconds to wait.
+            interval (float): Seconds between checks of the change log.
+
+        Returns:
+            dict: Same as get_changes; changes is empty if the wait timed out.
+        """
+        log_file = ChangeFeedService.get_feed_files(network_code)["log"]
+        deadline = time.monotonic() + timeout
+        last_size = -1
+
+        while True:
+            size = os.path.getsize(log_file) if os.path.exists(log_file) else 0
+            if size != last_size:
+                last_size = size
+                feed = ChangeFeedService.get_changes(network_code, since)
+                if feed["changes"] or feed["reset"]:
+                    return feed
+            if time.monotonic() >= deadline:
+                return feed
+            time.sleep(interval)
@@ -4,6 +4,9 @@ import json
 from datetime import datetime
 from googleads.errors import GoogleAdsServerFault, GoogleAdsValueError
 from utils.helpers import get_gam_client
+from utils.pql import select_rows
+from services.StatsService import StatsService
+from services.ChangeFeedService import ChangeFeedService
 
 
 class ChildPubService:
@@ -24,7 +27,10 @@ class ChildPubService:
             page_size (int): Number of records to fetch per request.
 
         Returns:
-            dict: Result with network_code, total_count, fetched_at, child_publishers.
+            dict: Result with network_code, total_count, fetched_at, status_counts,
+                child_publishers and sequence. The status counts are also appended
+                to the network's stats time series, and the publishers that changed
+                since the previous snapshot to its change feed.
         """
         # Load from environment variables or config if not provided
         network_code = network_code or os.getenv('GAM_NETWORK_CODE')
@@ -67,7 +73,7 @@ class ChildPubService:
                 """
 
                 try:
-                    response = pql_service.select({"query": pql_query})
+                    response = select_rows(pql_service, pql_query)
 
                     if not response or "columnTypes" not in response:
                         logging.error("Invalid response received from the server.")
@@ -98,7 +104,7 @@ class ChildPubService:
             for row in data["data"]:
                 publisher = {}
                 for i, column in enumerate(data["headers"]):
-                    publisher[column] = row["values"][i]["value"]
+                    publisher[column] = row[i]
                 child_publishers.append(publisher)
             
             # Create result
@@ -106,8 +112,11 @@ class ChildPubService:
                 "network_code": network_code,
                 "total_count": len(child_publishers),
                 "fetched_at": datetime.now().isoformat(),
+                "status_counts": StatsService.compute_status_counts(child_publishers),
                 "child_publishers": child_publishers
             }
+            StatsService.record_snapshot(result)
+            result["sequence"] = ChangeFeedService.record_snapshot(result)
             
             # # Save to JSON with network code in filename
             # output_file = f"child_publishers_{network_code}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
@@ -119,7 +128,16 @@ class ChildPubService:
             return result
         else:
             logging.info(f"No child publishers found for network {network_code}")
-            return {"network_code": network_code, "total_count": 0, "child_publishers": []}
+            result = {
+                "network_code": network_code,
+                "total_count": 0,
+                "fetched_at": datetime.now().isoformat(),
+                "status_counts": StatsService.compute_status_counts([]),
+                "child_publishers": []
+            }
+            StatsService.record_snapshot(result)
+            result["sequence"] = ChangeFeedService.record_snapshot(result)
+            return result
         
 
 
@@ -179,7 +197,7 @@ class ChildPubService:
                 """
 
                 try:
-                    response = pql_service.select({"query": pql_query})
+                    response = select_rows(pql_service, pql_query)
 
                     if not response or "columnTypes" not in response:
                         logging.error("Invalid response received from the server.")
@@ -210,7 +228,7 @@ class ChildPubService:
             for row in data["data"]:
                 account = {}
                 for i, column in enumerate(data["headers"]):
-                    account[column] = row["values"][i]["value"]
+                    account[column] = row[i]
                 manager_accounts.append(account)
             
             # Create result
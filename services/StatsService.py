@@ -0,0 +1,138 @@
+import logging
+import os
+import json
+import tempfile
+from datetime import datetime
+from utils.helpers import exclusive_lock, read_lines_reversed
+
+
+class StatsService:
+    # Snapshot columns that are aggregated, keyed by the name used in the stats payload
+    STATUS_FIELDS = {
+        "readiness": "Readiness Status",
+        "approval": "Approval Status",
+        "invitation": "Invitation Status",
+    }
+
+    # Points returned by get_series when the caller does not ask for more
+    DEFAULT_LIMIT = 1
+    MAX_LIMIT = 1000
+
+    @staticmethod
+    def get_stats_file(network_code):
+        """Get the time series file for specific network code."""
+        stats_dir = os.getenv('STATS_DIR', '.')
+        return os.path.join(stats_dir, f'stats_{network_code}.jsonl')
+
+    @staticmethod
+    def compute_status_counts(child_publishers):
+        """
+        Count child publishers by readiness, approval and invitation status.
+
+        Args:
+            child_publishers (list): Publisher dicts as produced by ChildPubService.
+
+        Returns:
+            dict: e.g. {"readiness": {"READY": 10}, "approval": {...}, "invitation": {...}}.
+        """
+        counts = {key: {} for key in StatsService.STATUS_FIELDS}
+        for publisher in child_publishers:
+            for key, column in StatsService.STATUS_FIELDS.items():
+                status = publisher.get(column) or "UNKNOWN"
+                counts[key][status] = counts[key].get(status, 0) + 1
+        return counts
+
+    @staticmethod
+    def record_snapshot(result):
+        """
+        Append the aggregates of a ChildPubService snapshot to the network's time series.
+
+        Once the file holds roughly twice STATS_RETENTION points (default
+        10000), it is compacted down to the newest STATS_RETENTION.
+
+        Args:
+            result (dict): Snapshot with network_code, total_count, fetched_at, status_counts.
+
+        Returns:
+            bool: True if successful, False otherwise.
+        """
+        network_code = result.get("network_code")
+        point = {
+            "fetched_at": result.get("fetched_at") or datetime.now().isoformat(),
+            "total_count": result.get("total_count", 0),
+            "status_counts": result.get("status_counts", {}),
+        }
+        try:
+            stats_file = StatsService.get_stats_file(network_code)
+            os.makedirs(os.path.dirname(stats_file) or '.', exist_ok=True)
+            line = json.dumps(point, ensure_ascii=False) + "\n"
+            with exclusive_lock(f"{stats_file}.lock"):
+                with open(stats_file, 'a', encoding='utf-8') as f:
+                    f.write(line)
+                StatsService._compact(stats_file, len(line.encode('utf-8')))
+            return True
+        except Exception as e:
+            logging.error(f"Failed to record stats for network {network_code}: {e}")
+            return False
+
+    @staticmethod
+    def _compact(stats_file, line_size):
+        """
+        Keep the newest STATS_RETENTION points once the file is about twice that
+        long, estimated from the size of the latest line. Must hold the lock.
+        """
+        retention = int(os.getenv('STATS_RETENTION', '10000'))
+        if os.path.getsize(stats_file) < 2 * retention * line_size:
+            return
+
+        with open(stats_file, 'r', encoding='utf-8') as f:
+            lines = [line for line in f if line.strip()]
+        if len(lines) <= retention:
+            return
+
+        fd, temp_file = tempfile.mkstemp(dir=os.path.dirname(stats_file) or '.', suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.writelines(lines[-retention:])
+        os.replace(temp_file, stats_file)
+        logging.info(f"Compacted {stats_file} to the last {retention} points")
+
+    @staticmethod
+    def get_series(network_code, start=None, end=None, limit=DEFAULT_LIMIT):
+        """
+        Load the most recent recorded aggregates for a network, oldest first.
+
+        The time series is read from its end, so only the returned points (and
+        any newer ones outside the range) are parsed.
+
+        Args:
+            network_code (str): The network code for the GAM account.
+            start (datetime): Only include points fetched at or after this time (naive, local).
+            end (datetime): Only include points fetched at or before this time (naive, local).
+            limit (int): Maximum number of points to return.
+
+        Returns:
+            list: Points with fetched_at, total_count and status_counts.
+        """
+        stats_file = StatsService.get_stats_file(network_code)
+        if not os.path.exists(stats_file):
+            return []
+
+        series = []
+        for line in read_lines_reversed(stats_file):
+            if len(series) >= limit:
+                break
+            try:
+                point = json.loads(line)
+                fetched_at = datetime.fromisoformat(point["fetched_at"])
+            except (ValueError, KeyError) as e:
+                logging.warning(f"Skipping malformed stats entry in {stats_file}: {e}")
+                continue
+            if end and fetched_at > end:
+                continue
+            if start and fetched_at < start:
+                # Points are appended in time order, so everything before this is older
+                break
+            series.append(point)
+
+        series.reverse()
+        return series
@@ -1,5 +1,7 @@
+from .ChangeFeedService import ChangeFeedService
 from .ChildPubService import ChildPubService
 from .EmailService import EmailService
 from .FirebaseService import FirebaseService
+from .StatsService import StatsService
 
-__all__ = ['ChildPubService', 'EmailService', 'FirebaseService']
+__all__ = ['ChangeFeedService', 'ChildPubService', 'EmailService', 'FirebaseService', 'StatsService']
@@ -1,3 +1,4 @@
-from .helpers import get_gam_client
+from .helpers import get_gam_client, read_lines_reversed, exclusive_lock
+from .pql import select_rows
 
-__all__ = ['get_gam_client']
+__all__ = ['get_gam_client', 'read_lines_reversed', 'exclusive_lock', 'select_rows']
@@ -2,8 +2,17 @@ import os
 import json
 import tempfile
 import logging
+import threading
+from contextlib import contextmanager
 from googleads import ad_manager
 
+try:
+    import fcntl
+except ImportError:  # Windows: writers are only serialised within this process
+    fcntl = None
+
+_process_lock = threading.Lock()
+
 
 def get_gam_client(network_code, service_account_path):
     """
@@ -83,3 +92,56 @@ def get_gam_client(network_code, service_account_path):
         logging.error(f"Failed to create GAM client: {e}")
         raise
 
+
+
+def read_lines_reversed(path, block_size=65536):
+    """
+    Yield the non-empty lines of a text file from last to first.
+
+    Reads the file backwards in blocks, so callers that only need the most
+    recent entries of an append-only log never touch the rest of it.
+
+    Args:
+        path (str): Path to a UTF-8 text file.
+        block_size (int): Number of bytes to read per step.
+
+    Yields:
+        str: Each line without its trailing newline, newest first.
+    """
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        remainder = b''
+        while position > 0:
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            lines = (f.read(read_size) + remainder).split(b'\n')
+            # The first piece may be the tail of a line that starts in an earlier block
+            remainder = lines.pop(0)
+            for line in reversed(lines):
+                if line.strip():
+                    yield line.decode('utf-8')
+        if remainder.strip():
+            yield remainder.decode('utf-8')
+
+
+@contextmanager
+def exclusive_lock(lock_file):
+    """
+    Hold an exclusive lock on a lock file, shared by all threads and processes.
+
+    Args:
+        lock_file (str): Path of the lock file; created if missing.
+    """
+    with open(lock_file, 'a') as f:
+        if fcntl is None:
+            with _process_lock:
+                yield
+            return
+        # flock applies per open file, so threads of one process exclude each other too
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
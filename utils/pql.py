@@ -0,0 +1,180 @@
+import io
+import os
+import logging
+import xml.etree.ElementTree as ET
+import zeep
+from googleads.errors import GoogleAdsServerFault
+
+
+XSI_TYPE = '{http://www.w3.org/2001/XMLSchema-instance}type'
+
+# PQL Value types the fast decoder understands, mapped to the same Python
+# values zeep produces for them (NumberValue.value is an xsd:string in the WSDL).
+VALUE_DECODERS = {
+    'TextValue': lambda text: text,
+    'NumberValue': lambda text: text,
+    'BooleanValue': lambda text: None if text is None else text.strip() in ('true', '1'),
+}
+
+
+class UnsupportedResponse(Exception):
+    """Raised when a selectResponse contains something the fast decoder does not handle."""
+
+
+class FaultResponse(Exception):
+    """Raised when the envelope is a SOAP fault rather than a selectResponse."""
+
+
+def _local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+def decode_select_response(content):
+    """
+    Decode a raw PQL selectResponse SOAP envelope with a streaming parser.
+
+    Args:
+        content (bytes): The raw XML body returned by PublisherQueryLanguageService.
+
+    Returns:
+        dict: {"columnTypes": [{"labelName": str}, ...], "rows": [tuple, ...]}.
+
+    Raises:
+        FaultResponse: If the envelope is a SOAP fault.
+        UnsupportedResponse: If the envelope is not a selectResponse, is malformed,
+            or contains a value type that is not in VALUE_DECODERS.
+    """
+    column_types = []
+    rows = []
+    row = []
+    cell_text = None
+    seen_result = False
+    local_names = {}
+
+    try:
+        # Only 'end' events are needed: by then each element's text and
+        # attributes are complete, which halves the parser callbacks.
+        for _, elem in ET.iterparse(io.BytesIO(content)):
+            name = local_names.get(elem.tag)
+            if name is None:
+                name = local_names[elem.tag] = _local_name(elem.tag)
+
+            if name == 'value':
+                cell_text = elem.text
+            elif name == 'values':
+                cell_type = elem.get(XSI_TYPE, '').rsplit(':', 1)[-1]
+                decoder = VALUE_DECODERS.get(cell_type)
+                if decoder is None or len(elem) > 1:
+                    raise UnsupportedResponse(f'Unsupported value type: {cell_type or "untyped"}')
+                row.append(decoder(cell_text))
+                cell_text = None
+            elif name == 'rows':
+                rows.append(tuple(row))
+                row = []
+                elem.clear()
+            elif name == 'labelName':
+                column_types.append({'labelName': elem.text})
+            elif name == 'rval':
+                seen_result = True
+            elif name == 'Fault':
+                raise FaultResponse('SOAP fault')
+    except ET.ParseError as e:
+        raise UnsupportedResponse(f'Malformed XML: {e}')
+
+    if not seen_result:
+        raise UnsupportedResponse('Not a selectResponse')
+
+    return {'columnTypes': column_types, 'rows': rows}
+
+
+def _rows_from_zeep(rval):
+    """Convert a zeep ResultSet into the same shape decode_select_response returns."""
+    if not rval or "columnTypes" not in rval:
+        return rval
+
+    return {
+        'columnTypes': [{'labelName': column["labelName"]} for column in rval["columnTypes"]],
+        'rows': [
+            tuple(value["value"] for value in row["values"])
+            for row in (rval["rows"] if "rows" in rval and rval["rows"] else [])
+        ],
+    }
+
+
+def _process_with_zeep(pql_service, response):
+    """
+    Deserialise a raw select response with zeep, without another request to GAM.
+
+    Returns:
+        The zeep ResultSet (rval), as pql_service.select would.
+
+    Raises:
+        GoogleAdsServerFault: If the response is a SOAP fault, converted the
+            same way googleads does in its own SOAP method wrapper.
+    """
+    zeep_client = pql_service.zeep_client
+    binding = zeep_client.service._binding
+    try:
+        return binding.process_reply(zeep_client, binding.get('select'), response)['body']['rval']
+    except zeep.exceptions.Fault as e:
+        error_list = ()
+        # For non-SOAP bodies (e.g. an HTML 502 page) zeep puts the raw bytes in detail
+        if e.detail is not None and not isinstance(e.detail, (bytes, str)):
+            namespace = pql_service._GetBindingNamespace()
+            underlying_exception = e.detail.find('{%s}ApiExceptionFault' % namespace)
+            if underlying_exception is not None:
+                fault_type = zeep_client.get_element('{%s}ApiExceptionFault' % namespace)
+                fault = fault_type.parse(underlying_exception, zeep_client.wsdl.types)
+                error_list = fault.errors or error_list
+        raise GoogleAdsServerFault(e.detail, errors=error_list, message=e.message)
+
+
+def _fast_select(pql_service, query):
+    """Issue the select call through zeep but decode the raw HTTP response ourselves."""
+    zeep_client = pql_service.zeep_client
+    packed_args = pql_service._PackArguments('select', ({'query': query},))
+    soap_headers = pql_service._GetZeepFormattedSOAPHeaders()
+    with zeep_client.settings(raw_response=True):
+        response = zeep_client.service['select'](*packed_args, _soapheaders=soap_headers)
+
+    if response.status_code != 200:
+        _process_with_zeep(pql_service, response)
+        raise GoogleAdsServerFault(
+            None, message=f"HTTP {response.status_code} from PublisherQueryLanguageService")
+
+    try:
+        return decode_select_response(response.content)
+    except FaultResponse:
+        return _rows_from_zeep(_process_with_zeep(pql_service, response))
+    except UnsupportedResponse as e:
+        # Decode the response we already have with zeep rather than asking GAM again
+        logging.info(f"Fast PQL decoding unavailable, decoding with zeep instead: {e}")
+        return _rows_from_zeep(_process_with_zeep(pql_service, response))
+
+
+def select_rows(pql_service, query, fast=None):
+    """
+    Run a PQL query and return its ResultSet with each row as a tuple of values.
+
+    The fast path parses the raw selectResponse XML directly. A response it
+    cannot decode is handed to zeep as-is, so GAM is only ever queried once.
+    Faults and non-200 responses are raised as GoogleAdsServerFault and
+    transport errors propagate, as on the zeep path.
+
+    Args:
+        pql_service: A PublisherQueryLanguageService from client.GetService.
+        query (str): The PQL statement.
+        fast (bool): Use the fast decoder. Defaults to the GAM_FAST_PQL
+            environment variable, which is disabled unless set to 'true'.
+
+    Returns:
+        dict: {"columnTypes": [...], "rows": [tuple, ...]}, or the zeep
+            response as-is if it has no columnTypes.
+    """
+    if fast is None:
+        fast = os.getenv('GAM_FAST_PQL', 'false').lower() == 'true'
+
+    if fast:
+        return _fast_select(pql_service, query)
+
+    return _rows_from_zeep(pql_service.select({"query": query}))